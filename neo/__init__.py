@@ -9,6 +9,24 @@ logging_handler = logging.StreamHandler()
 
 from neo.core import *
 # ~ import neo.rawio
-from neo.io import *
+from neo.io import get_io
 
 from neo.version import version as __version__
+
+# "from neo import *" binds the neo.core classes and, as before the io
+# classes were imported lazily, everything in neo.io.__all__. This imports
+# all the ios, but only for star imports
+__all__ = [name for name in dir() if not name.startswith('_')]
+__all__ += [name for name in io.__all__ if name not in __all__]
+
+
+def __getattr__(name):
+    # io classes (and iolist) are imported lazily by neo.io, so they are
+    # looked up there on first access. Only the public names of neo.io are
+    # forwarded, so that e.g. __all__ is not taken from neo.io and
+    # "from neo import *" still binds the neo.core classes
+    from neo import io
+    if name in io.__all__:
+        return getattr(io, name)
+    raise AttributeError("module {!r} has no attribute {!r}".format(
+        __name__, name))
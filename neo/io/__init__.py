@@ -5,7 +5,13 @@ electrophysiological data files.
 Note that if the package dependency is not satisfied for one io, it does not
 raise an error but a warning.
 
-:attr:`neo.io.iolist` provides a list of successfully imported io classes.
+:attr:`neo.io.iolist` provides a tuple of all registered io classes, in the
+order in which :func:`get_io` tries them. It is built, and the io classes
+imported, on first access.
+
+IO classes are imported on first access, so that ``import neo.io`` stays fast
+and only pulls in the dependencies of the ios which are actually used. Set the
+environment variable ``NEO_EAGER_IMPORT=1`` to import all of them up front.
 
 Functions:
 
@@ -227,122 +233,257 @@ Classes:
 
 """
 
-import os.path
-
-# try to import the neuroshare library.
-# if it is present, use the neuroshareapiio to load neuroshare files
-# if it is not present, use the neurosharectypesio to load files
-try:
-    import neuroshare as ns
-except ImportError as err:
-    from neo.io.neurosharectypesio import NeurosharectypesIO as NeuroshareIO
-    # print("\n neuroshare library not found, loading data with ctypes" )
-    # print("\n to use the API be sure to install the library found at:")
-    # print("\n www.http://pythonhosted.org/neuroshare/")
-
-else:
-    from neo.io.neuroshareapiio import NeuroshareapiIO as NeuroshareIO
-    # print("neuroshare library successfully imported")
-    # print("\n loading with API...")
-
-from neo.io.alphaomegaio import AlphaOmegaIO
-from neo.io.asciiimageio import AsciiImageIO
-from neo.io.asciisignalio import AsciiSignalIO
-from neo.io.asciispiketrainio import AsciiSpikeTrainIO
-from neo.io.axographio import AxographIO
-from neo.io.axonio import AxonIO
-from neo.io.blackrockio import BlackrockIO
-from neo.io.blkio import BlkIO
-from neo.io.bci2000io import BCI2000IO
-from neo.io.brainvisionio import BrainVisionIO
-from neo.io.brainwaredamio import BrainwareDamIO
-from neo.io.brainwaref32io import BrainwareF32IO
-from neo.io.brainwaresrcio import BrainwareSrcIO
-from neo.io.elanio import ElanIO
-# from neo.io.elphyio import ElphyIO
-from neo.io.exampleio import ExampleIO
-from neo.io.igorproio import IgorIO
-from neo.io.intanio import IntanIO
-from neo.io.klustakwikio import KlustaKwikIO
-from neo.io.kwikio import KwikIO
-from neo.io.mearecio import MEArecIO
-from neo.io.micromedio import MicromedIO
-from neo.io.neomatlabio import NeoMatlabIO
-from neo.io.nestio import NestIO
-from neo.io.neuralynxio import NeuralynxIO
-from neo.io.neuroexplorerio import NeuroExplorerIO
-from neo.io.neuroscopeio import NeuroScopeIO
-from neo.io.nixio import NixIO
-from neo.io.nixio_fr import NixIO as NixIOFr
-from neo.io.nsdfio import NSDFIO
-from neo.io.openephysio import OpenEphysIO
-from neo.io.phyio import PhyIO
-from neo.io.pickleio import PickleIO
-from neo.io.plexonio import PlexonIO
-from neo.io.rawbinarysignalio import RawBinarySignalIO
-from neo.io.rawmcsio import RawMCSIO
-from neo.io.spike2io import Spike2IO
-from neo.io.spikeglxio import SpikeGLXIO
-from neo.io.stimfitio import StimfitIO
-from neo.io.tdtio import TdtIO
-from neo.io.tiffio import TiffIO
-from neo.io.winedrio import WinEdrIO
-from neo.io.winwcpio import WinWcpIO
-
-iolist = [
-    AlphaOmegaIO,
-    AsciiImageIO,
-    AsciiSignalIO,
-    AsciiSpikeTrainIO,
-    AxographIO,
-    AxonIO,
-    BCI2000IO,
-    BlackrockIO,
-    BlkIO,
-    BrainVisionIO,
-    BrainwareDamIO,
-    BrainwareF32IO,
-    BrainwareSrcIO,
-    ElanIO,
-    # ElphyIO,
-    ExampleIO,
-    IgorIO,
-    IntanIO,
-    KlustaKwikIO,
-    KwikIO,
-    MEArecIO,
-    MicromedIO,
-    NixIO,  # place NixIO before other IOs that use HDF5 to make it the default for .h5 files
-    NeoMatlabIO,
-    NestIO,
-    NeuralynxIO,
-    NeuroExplorerIO,
-    NeuroScopeIO,
-    NeuroshareIO,
-    NSDFIO,
-    OpenEphysIO,
-    PhyIO,
-    PickleIO,
-    PlexonIO,
-    RawBinarySignalIO,
-    RawMCSIO,
-    Spike2IO,
-    SpikeGLXIO,
-    StimfitIO,
-    TdtIO,
-    TiffIO,
-    WinEdrIO,
-    WinWcpIO
-]
-
-
-def get_io(filename, *args, **kwargs):
+import collections
+import functools
+import importlib
+import os
+
+# proxy objects are used by neo.core and neo.utils, so always import them
+from neo.io import proxyobjects
+
+# io classes are imported on first access (see __getattr__ below), so that
+# importing neo.io does not import the dependencies of every single io.
+# Each entry maps the public name of an io class to (module, class name).
+_lazy_map = {
+    'AlphaOmegaIO': ('neo.io.alphaomegaio', 'AlphaOmegaIO'),
+    'AsciiImageIO': ('neo.io.asciiimageio', 'AsciiImageIO'),
+    'AsciiSignalIO': ('neo.io.asciisignalio', 'AsciiSignalIO'),
+    'AsciiSpikeTrainIO': ('neo.io.asciispiketrainio', 'AsciiSpikeTrainIO'),
+    'AxographIO': ('neo.io.axographio', 'AxographIO'),
+    'AxonIO': ('neo.io.axonio', 'AxonIO'),
+    'BlackrockIO': ('neo.io.blackrockio', 'BlackrockIO'),
+    'BlkIO': ('neo.io.blkio', 'BlkIO'),
+    'BCI2000IO': ('neo.io.bci2000io', 'BCI2000IO'),
+    'BrainVisionIO': ('neo.io.brainvisionio', 'BrainVisionIO'),
+    'BrainwareDamIO': ('neo.io.brainwaredamio', 'BrainwareDamIO'),
+    'BrainwareF32IO': ('neo.io.brainwaref32io', 'BrainwareF32IO'),
+    'BrainwareSrcIO': ('neo.io.brainwaresrcio', 'BrainwareSrcIO'),
+    'ElanIO': ('neo.io.elanio', 'ElanIO'),
+    # 'ElphyIO': ('neo.io.elphyio', 'ElphyIO'),
+    'ExampleIO': ('neo.io.exampleio', 'ExampleIO'),
+    'IgorIO': ('neo.io.igorproio', 'IgorIO'),
+    'IntanIO': ('neo.io.intanio', 'IntanIO'),
+    'KlustaKwikIO': ('neo.io.klustakwikio', 'KlustaKwikIO'),
+    'KwikIO': ('neo.io.kwikio', 'KwikIO'),
+    'MEArecIO': ('neo.io.mearecio', 'MEArecIO'),
+    'MicromedIO': ('neo.io.micromedio', 'MicromedIO'),
+    'NeoMatlabIO': ('neo.io.neomatlabio', 'NeoMatlabIO'),
+    'NestIO': ('neo.io.nestio', 'NestIO'),
+    'NeuralynxIO': ('neo.io.neuralynxio', 'NeuralynxIO'),
+    'NeuroExplorerIO': ('neo.io.neuroexplorerio', 'NeuroExplorerIO'),
+    'NeuroScopeIO': ('neo.io.neuroscopeio', 'NeuroScopeIO'),
+    'NeuroshareIO': None,  # depends on the neuroshare library, see _resolve
+    'NixIO': ('neo.io.nixio', 'NixIO'),
+    'NixIOFr': ('neo.io.nixio_fr', 'NixIO'),
+    'NSDFIO': ('neo.io.nsdfio', 'NSDFIO'),
+    'OpenEphysIO': ('neo.io.openephysio', 'OpenEphysIO'),
+    'PhyIO': ('neo.io.phyio', 'PhyIO'),
+    'PickleIO': ('neo.io.pickleio', 'PickleIO'),
+    'PlexonIO': ('neo.io.plexonio', 'PlexonIO'),
+    'RawBinarySignalIO': ('neo.io.rawbinarysignalio', 'RawBinarySignalIO'),
+    'RawMCSIO': ('neo.io.rawmcsio', 'RawMCSIO'),
+    'Spike2IO': ('neo.io.spike2io', 'Spike2IO'),
+    'SpikeGLXIO': ('neo.io.spikeglxio', 'SpikeGLXIO'),
+    'StimfitIO': ('neo.io.stimfitio', 'StimfitIO'),
+    'TdtIO': ('neo.io.tdtio', 'TdtIO'),
+    'TiffIO': ('neo.io.tiffio', 'TiffIO'),
+    'WinEdrIO': ('neo.io.winedrio', 'WinEdrIO'),
+    'WinWcpIO': ('neo.io.winwcpio', 'WinWcpIO'),
+}
+
+__all__ = ('get_io', 'iolist', *sorted(_lazy_map))
+
+# (name, extensions) of the io classes in iolist, in the order in which
+# get_io() tries them. Extensions are listed here rather than read from the
+# classes so that get_io() only has to import the io it returns.
+_IO_REGISTRY = (
+    ('AlphaOmegaIO', ('map',)),
+    ('AsciiImageIO', ()),
+    ('AsciiSignalIO', ('txt', 'asc', 'csv', 'tsv')),
+    ('AsciiSpikeTrainIO', ('txt',)),
+    ('AxographIO', ('axgd', 'axgx')),
+    ('AxonIO', ('abf',)),
+    ('BCI2000IO', ('dat',)),
+    ('BlackrockIO', ('ns1', 'ns2', 'ns3', 'ns4', 'ns5', 'ns6', 'nev')),
+    ('BlkIO', ()),
+    ('BrainVisionIO', ('vhdr',)),
+    ('BrainwareDamIO', ('dam',)),
+    ('BrainwareF32IO', ('f32',)),
+    ('BrainwareSrcIO', ('src',)),
+    ('ElanIO', ('eeg',)),
+    # ('ElphyIO', ('DAT',)),
+    ('ExampleIO', ('fake',)),
+    ('IgorIO', ('ibw', 'pxp')),
+    ('IntanIO', ('rhd', 'rhs')),
+    ('KlustaKwikIO', ('fet', 'clu', 'res', 'spk')),
+    ('KwikIO', ('kwik',)),
+    ('MEArecIO', ('h5',)),
+    ('MicromedIO', ('trc', 'TRC')),
+    # for .h5 files get_io() tries MEArecIO, then NixIO, then NSDFIO, as in iolist
+    ('NixIO', ('h5', 'nix')),
+    ('NeoMatlabIO', ('mat',)),
+    ('NestIO', ('gdf', 'dat')),
+    ('NeuralynxIO', ('nse', 'ncs', 'nev', 'ntt')),
+    ('NeuroExplorerIO', ('nex',)),
+    ('NeuroScopeIO', ('xml', 'dat')),
+    ('NeuroshareIO', ()),
+    ('NSDFIO', ('h5',)),
+    ('OpenEphysIO', ()),
+    ('PhyIO', ()),
+    ('PickleIO', ('pkl', 'pickle')),
+    ('PlexonIO', ('plx',)),
+    ('RawBinarySignalIO', ('raw', '*')),
+    ('RawMCSIO', ('raw',)),
+    ('Spike2IO', ('smr',)),
+    ('SpikeGLXIO', ()),
+    ('StimfitIO', ('abf', 'dat', 'axgx', 'axgd', 'cfs')),
+    ('TdtIO', ()),
+    ('TiffIO', ()),
+    ('WinEdrIO', ('EDR', 'edr')),
+    ('WinWcpIO', ('wcp',)),
+)
+# normalize extensions once, to lower case frozensets
+_IO_REGISTRY = tuple((io_name, frozenset(ext.lower() for ext in extensions))
+                     for io_name, extensions in _IO_REGISTRY)
+
+
+def __getattr__(name):
     """
-    Return a Neo IO instance, guessing the type based on the filename suffix.
+    Import io classes (and build iolist) on first access. They are cached
+    by _resolve rather than stored in the module namespace.
     """
-    extension = os.path.splitext(filename)[1][1:]
-    for io in iolist:
-        if extension in io.extensions:
-            return io(filename, *args, **kwargs)
+    if name == 'iolist':
+        return _get_iolist()
+    if name in _lazy_map:
+        return _resolve(name)
+    raise AttributeError("module {!r} has no attribute {!r}".format(
+        __name__, name))
+
+
+def __dir__():
+    return list(__all__)
+
+
+@functools.lru_cache(maxsize=None)
+def _get_iolist():
+    return tuple(_resolve(io_name) for io_name, _ in _IO_REGISTRY)
 
+
+@functools.lru_cache(maxsize=None)
+def _resolve(name):
+    """
+    Return the io class with the given public name, importing it if needed.
+    """
+    if name == 'NeuroshareIO':
+        # if the neuroshare library is present, use the neuroshareapiio to
+        # load neuroshare files, otherwise use the neurosharectypesio
+        try:
+            import neuroshare
+        except ImportError:
+            module_name, class_name = 'neo.io.neurosharectypesio', 'NeurosharectypesIO'
+        else:
+            module_name, class_name = 'neo.io.neuroshareapiio', 'NeuroshareapiIO'
+    else:
+        module_name, class_name = _lazy_map[name]
+    return getattr(importlib.import_module(module_name), class_name)
+
+
+_EXT_INDEX = None
+# 64 bit bitmap with bit (hash(extension) & 63) set for every registered
+# extension, to reject unknown extensions without a dict lookup
+_EXT_BLOOM = 0
+
+
+def _get_ext_index():
+    """
+    Return a dict mapping each lower case extension to a tuple of the names
+    of the ios supporting it, in registry (i.e. priority) order, so that the
+    first one is the default io for that extension. The dict is built on
+    first use.
+    """
+    global _EXT_INDEX, _EXT_BLOOM
+    if _EXT_INDEX is None:
+        ext_index = {}
+        for io_name, extensions in _IO_REGISTRY:
+            for extension in extensions:
+                ext_index[extension] = ext_index.get(extension, ()) + (io_name,)
+        for extension in ext_index:
+            _EXT_BLOOM |= 1 << (hash(extension) & 63)
+        _EXT_INDEX = ext_index
+    return _EXT_INDEX
+
+
+def _get_extensions(filename, max_parts=3):
+    """
+    Return the lower case extensions of filename, without the leading dot,
+    from the longest compound extension (at most max_parts dotted suffixes,
+    e.g. 'nwb.h5') down to the last suffix alone (e.g. 'h5').
+    """
+    filename = os.fspath(filename)
+    # ignore dots in directory names
+    basename = filename[max(filename.rfind('/'), filename.rfind('\\')) + 1:]
+    # as in os.path.splitext, leading dots do not start an extension
+    basename = basename.lstrip('.')
+    parts = basename.lower().rsplit('.', max_parts)[1:]
+    return ['.'.join(parts[i:]) for i in range(len(parts))]
+
+
+# import everything up front, e.g. to catch broken ios early in CI
+if os.environ.get('NEO_EAGER_IMPORT') == '1':
+    _get_iolist()
+    for _name in _lazy_map:
+        _resolve(_name)
+
+
+# ios created by get_io(..., reuse_io=True), most recently used last
+_INSTANCE_CACHE = collections.OrderedDict()
+_INSTANCE_CACHE_SIZE = 32
+
+
+def get_io(filename, *args, reuse_io=False, **kwargs):
+    """
+    Return a Neo IO instance, guessing the type based on the filename suffix.
+
+    If reuse_io is True, the instance is kept and returned again by later calls
+    with the same file and arguments, as long as the file is not modified,
+    instead of creating a new io and parsing the file again. This is meant
+    for reading only. reuse_io is reserved by get_io() and is not passed to
+    the io class, whereas all other arguments are.
+    """
+    if not reuse_io:
+        return _create_io(filename, args, kwargs)
+
+    try:
+        key = (os.path.abspath(filename), args, tuple(sorted(kwargs.items())))
+        hash(key)
+        mtime = os.stat(filename).st_mtime_ns
+    except (OSError, TypeError):
+        # the file does not exist (yet) or the arguments are not hashable
+        return _create_io(filename, args, kwargs)
+
+    if key in _INSTANCE_CACHE:
+        cached_mtime, io = _INSTANCE_CACHE[key]
+        if cached_mtime == mtime:
+            _INSTANCE_CACHE.move_to_end(key)
+            return io
+        del _INSTANCE_CACHE[key]
+
+    io = _create_io(filename, args, kwargs)
+    _INSTANCE_CACHE[key] = (mtime, io)
+    if len(_INSTANCE_CACHE) > _INSTANCE_CACHE_SIZE:
+        _INSTANCE_CACHE.popitem(last=False)
+    return io
+
+
+def _create_io(filename, args, kwargs):
+    ext_index = _get_ext_index()
+    extensions = _get_extensions(filename)
+    for extension in extensions:
+        if not (_EXT_BLOOM >> (hash(extension) & 63)) & 1:
+            continue  # certainly not registered
+        io_names = ext_index.get(extension)
+        if io_names:
+            return _resolve(io_names[0])(filename, *args, **kwargs)
+
+    extension = extensions[-1] if extensions else ''
     raise IOError("File extension %s not registered" % extension)
@@ -68,8 +68,13 @@ Acquisition modes:
     must store it all in memory until data acquisition ends. This also affected
     how file slicing was implmented for this RawIO: Instead of using a single
     memmap to address into a 2-dimensional block of data, AxographRawIO
-    constructs multiple 1-dimensional memmaps, one for each column, each with
-    its own offset.
+    constructs multiple 1-dimensional views into a memmap of the whole file,
+    one for each column, each with its own offset. When the columns of a
+    segment are evenly spaced in the file (e.g., because their titles have the
+    same length), they are additionally exposed as a single strided
+    2-dimensional memmap. Either way, signal chunks are returned in the native
+    byte order of their dtype (e.g., int16), although AxoGraph files are
+    big-endian.
 
     Each column's data array is preceded by a header containing the column
     title, which normally contains the units (e.g., "Current (nA)"). Data
@@ -101,7 +106,18 @@ Acquisition modes:
 
     Trace headers contain additional information about the series, such as plot
     style, which is parsed by AxographRawIO and made available in
-    self.info['trace_header_info_list'] but is otherwise unused.
+    self.info['trace_headers'] but is otherwise unused. This is a NumPy
+    structured array with one record per trace, in file order, so that trace
+    i+1 in the AxoGraph GUI is record i, and one field per header entry,
+    including 'trace_header_version'. If all traces share one header version,
+    it is also given by self.info['trace_header_version']; otherwise fields
+    that an older header version lacks are set to -1 in its records. Booleans
+    are stored as 0 or 1, and trace_color as a subarray of 3 values.
+
+    self.info['trace_header_info_list'] is deprecated. It still gives the
+    headers in their previous form, a read-only mapping from the 1-based trace
+    number to a dict of the header entries (with bools and tuples), built
+    from self.info['trace_headers'] on access.
 
 "Group": analogous to a Neo ChannelIndex for matching channels across Segments
     A group is a collection of one or more traces. Like traces, raw data is not
@@ -157,10 +173,15 @@ Acquisition modes:
 from .baserawio import (BaseRawIO, _signal_channel_dtype, _signal_stream_dtype,
                 _spike_channel_dtype, _event_channel_dtype)
 
+import codecs
+import logging
 import os
+import warnings
+from collections import namedtuple
+from collections.abc import Mapping
 from datetime import datetime
-from io import open, BufferedReader
-from struct import unpack, calcsize
+from io import open
+from struct import Struct
 
 import numpy as np
 
@@ -278,16 +299,45 @@ class AxographRawIO(BaseRawIO):
     def _get_analogsignal_chunk(self, block_index, seg_index, i_start, i_stop,
                                 stream_index, channel_indexes):
 
-        if channel_indexes is None or \
-           np.all(channel_indexes == slice(None, None, None)):
-            channel_indexes = range(self.signal_channels_count(stream_index))
+        sig_memmaps = self._raw_signals[seg_index]
+        raw_signals_2d = self._raw_signals_2d[seg_index]
 
-        raw_signals = [self._raw_signals
-                       [seg_index]
-                       [channel_index]
-                       [slice(i_start, i_stop)]
-                       for channel_index in channel_indexes]
-        raw_signals = np.array(raw_signals).T  # loads data into memory
+        if channel_indexes is None:
+            channel_indexes = slice(None)
+
+        # whichever path is taken, chunks are returned in the native byte
+        # order of the column dtype (e.g. int16 rather than the file's >i2)
+        if raw_signals_2d is not None:
+            if isinstance(channel_indexes, slice):
+                # a slice of the 2-D memmap
+                raw_signals = raw_signals_2d[slice(i_start, i_stop),
+                                             channel_indexes]
+            else:
+                # a single fancy-indexed read from the 2-D memmap
+                raw_signals = raw_signals_2d[slice(i_start, i_stop),
+                                             np.asarray(channel_indexes,
+                                                        dtype=int)]
+            # this copies the data into memory unless it is already native,
+            # i.e. on big-endian machines, where a slice stays a memmap view
+            return raw_signals.astype(raw_signals.dtype.newbyteorder('='),
+                                      copy=False)
+
+        if isinstance(channel_indexes, slice):
+            channel_indexes = range(len(sig_memmaps))[channel_indexes]
+
+        # allocate the output in its final (time, channel) layout and copy
+        # each column into it, which loads data into memory
+        i_start, i_stop, _ = slice(i_start, i_stop).indices(len(sig_memmaps[0]))
+        # an empty selection gets the dtype of the whole stream
+        dtypes = [sig_memmaps[channel_index].dtype
+                  for channel_index in channel_indexes]
+        if not dtypes:
+            dtypes = [sig_memmap.dtype for sig_memmap in sig_memmaps]
+        dtype = np.result_type(*dtypes)
+        raw_signals = np.empty((max(i_stop - i_start, 0), len(channel_indexes)),
+                               dtype=dtype)
+        for k, channel_index in enumerate(channel_indexes):
+            raw_signals[:, k] = sig_memmaps[channel_index][i_start:i_stop]
 
         return raw_signals
 
@@ -431,22 +481,27 @@ class AxographRawIO(BaseRawIO):
             self.logger.debug('Cannot treat as episodic because group '
                               'metadata is missing or could not be parsed')
             return False
-        if 'trace_header_info_list' not in self.info:
+        if 'trace_headers' not in self.info:
             self.logger.debug('Cannot treat as episodic because trace '
                               'metadata is missing or could not be parsed')
             return False
 
-        group_id_to_col_indexes = {}
-        for group_id in self.info['group_header_info_list']:
-            col_indexes = []
-            for trace_header in self.info['trace_header_info_list'].values():
-                if trace_header['group_id_for_this_trace'] == group_id:
-                    col_indexes.append(trace_header['y_index'])
-            group_id_to_col_indexes[group_id] = col_indexes
-        n_traces_by_group = {k: len(v) for k, v in
-                             group_id_to_col_indexes.items()}
-        all_groups_have_same_number_of_traces = len(np.unique(list(
-            n_traces_by_group.values()))) == 1
+        # collect the group and y-index of every trace that belongs to one of
+        # the groups, then count traces per group in a single pass
+        group_ids = np.sort(list(self.info['group_header_info_list']))
+        trace_headers = self.info['trace_headers']
+        trace_group_ids = \
+            trace_headers['group_id_for_this_trace'].astype(np.int64)
+        trace_y_indexes = trace_headers['y_index'].astype(np.int64)
+        in_a_group = np.isin(trace_group_ids, group_ids)
+        trace_group_ids = trace_group_ids[in_a_group]
+        trace_y_indexes = trace_y_indexes[in_a_group]
+        n_traces_by_group = np.bincount(
+            np.searchsorted(group_ids, trace_group_ids),
+            minlength=len(group_ids))
+        all_groups_have_same_number_of_traces = \
+            n_traces_by_group.size > 0 and \
+            n_traces_by_group.min() == n_traces_by_group.max()
 
         if not all_groups_have_same_number_of_traces:
             self.logger.debug('Cannot treat as episodic because groups differ '
@@ -455,7 +510,7 @@ class AxographRawIO(BaseRawIO):
 
         # Fourth check: The number of traces in each group should equal
         # n_episodes.
-        n_traces_per_group = np.unique(list(n_traces_by_group.values()))
+        n_traces_per_group = n_traces_by_group[0]
         if n_traces_per_group != self.info['n_episodes']:
             self.logger.debug('Cannot treat as episodic because n_episodes '
                               'does not match number of traces per group')
@@ -466,20 +521,21 @@ class AxographRawIO(BaseRawIO):
         # except for their unique ids. This too is generally true of
         # "continuous" (single-episode) files, which normally have 1 trace per
         # group.
+        # - a stable sort by group keeps traces within a group in file order
+        order = np.argsort(trace_group_ids, kind='stable')
         signal_channels_with_ids_dropped = \
             self.header['signal_channels'][
                 [n for n in self.header['signal_channels'].dtype.names
                  if n != 'id']]
-        group_has_uniform_signal_parameters = {}
-        for group_id, col_indexes in group_id_to_col_indexes.items():
-            # subtract 1 from indexes in next statement because time is not
-            # included in signal_channels
-            signal_params_for_group = np.array(
-                signal_channels_with_ids_dropped[np.array(col_indexes) - 1])
-            group_has_uniform_signal_parameters[group_id] = \
-                len(np.unique(signal_params_for_group)) == 1
-        all_groups_have_uniform_signal_parameters = \
-            np.all(list(group_has_uniform_signal_parameters.values()))
+        # subtract 1 from indexes in next statement because time is not
+        # included in signal_channels
+        signal_params_by_group = np.split(
+            signal_channels_with_ids_dropped[trace_y_indexes[order] - 1],
+            np.cumsum(n_traces_by_group)[:-1])
+        all_groups_have_uniform_signal_parameters = all(
+            len(signal_params_for_group) > 0
+            and np.all(signal_params_for_group == signal_params_for_group[0])
+            for signal_params_for_group in signal_params_by_group)
 
         if not all_groups_have_uniform_signal_parameters:
             self.logger.debug('Cannot treat as episodic because some groups '
@@ -511,11 +567,63 @@ class AxographRawIO(BaseRawIO):
                 sig_memmaps[first_index:first_index + n_channels])
         self._raw_signals = new_sig_memmaps
 
-        self.logger.debug('New number of segments: {}'.format(
-            self.info['n_episodes']))
+        # split the 2-D view of signal data into one view per segment
+        # - columns repeat in the same order in each episode, so if they are
+        #   evenly spaced, the episodes are too, and a 3-D (segment, sample,
+        #   channel) view can be laid over the same memmap without copying
+        raw_signals_2d = self._raw_signals_2d[0]
+        if raw_signals_2d is not None:
+            sample_stride, col_stride = raw_signals_2d.strides
+            raw_signals_3d = np.lib.stride_tricks.as_strided(
+                raw_signals_2d,
+                shape=(self.info['n_episodes'], raw_signals_2d.shape[0],
+                       n_channels),
+                strides=(n_channels * col_stride, sample_stride, col_stride),
+                writeable=False)
+            self._raw_signals_2d = list(raw_signals_3d)
+        else:
+            self._raw_signals_2d = [None] * self.info['n_episodes']
+
+        self.logger.debug('New number of segments: %s',
+                          self.info['n_episodes'])
 
         return
 
+    def _stack_signals(self, sig_memmaps, sig_offsets):
+        """
+        Construct a single 2-dimensional (sample, channel) memmap spanning the
+        columns of a segment, or return None if this is not possible. Column
+        data is interleaved with column headers in the file, so this works
+        only if all columns share the same dtype and length and are evenly
+        spaced, which is the case when their headers all have the same size
+        (e.g., titles of the same length).
+        """
+
+        if len(sig_memmaps) == 0:
+            return None
+
+        dtype = sig_memmaps[0].dtype
+        n_points = len(sig_memmaps[0])
+        if n_points == 0 or any(array.dtype != dtype or len(array) != n_points
+                                for array in sig_memmaps):
+            return None
+
+        col_stride = sig_memmaps[0].nbytes
+        if len(sig_offsets) > 1:
+            col_strides = np.diff(sig_offsets)
+            if np.any(col_strides != col_strides[0]):
+                return None
+            col_stride = int(col_strides[0])
+
+        raw_signals_2d = np.ndarray(
+            shape=(n_points, len(sig_memmaps)),
+            dtype=dtype,
+            buffer=self._file_memmap,
+            offset=sig_offsets[0],
+            strides=(dtype.itemsize, col_stride))
+
+        return raw_signals_2d
+
     def _get_rec_datetime(self):
         """
         Determine the date and time at which the recording was started from
@@ -565,9 +673,16 @@ class AxographRawIO(BaseRawIO):
         self.info = {}
 
         with open(self.filename, 'rb') as fid:
-            f = StructFile(fid)
 
-            self.logger.debug('filename: {}'.format(self.filename))
+            # a single memory map of the whole file is shared by the parser
+            # and by all columns (mmap cannot map an empty file)
+            if os.fstat(fid.fileno()).st_size > 0:
+                file_memmap = np.memmap(fid, mode='r', dtype='u1')
+            else:
+                file_memmap = np.zeros(0, dtype='u1')
+            f = StructFile(file_memmap)
+
+            self.logger.debug('filename: %s', self.filename)
             self.logger.debug('')
 
             # the first 4 bytes are always a 4-character file type identifier
@@ -578,7 +693,7 @@ class AxographRawIO(BaseRawIO):
             assert header_id in ['AxGr', 'axgx'], \
                 'not an AxoGraph binary file! "{}"'.format(self.filename)
 
-            self.logger.debug('header_id: {}'.format(header_id))
+            self.logger.debug('header_id: %s', header_id)
 
             # the next two numbers store the format version number and the
             # number of data columns to follow
@@ -603,25 +718,26 @@ class AxographRawIO(BaseRawIO):
             self.info['format_ver'] = format_ver
             self.info['n_cols'] = n_cols
 
-            self.logger.debug('format_ver: {}'.format(format_ver))
-            self.logger.debug('n_cols: {}'.format(n_cols))
+            self.logger.debug('format_ver: %s', format_ver)
+            self.logger.debug('n_cols: %s', n_cols)
             self.logger.debug('')
 
             ##############################################
             # BEGIN COLUMNS
 
             sig_memmaps = []
+            sig_offsets = []
             sig_channels = []
             for i in range(n_cols):
 
-                self.logger.debug('== COLUMN INDEX {} =='.format(i))
+                self.logger.debug('== COLUMN INDEX %s ==', i)
 
                 ##############################################
                 # NUMBER OF DATA POINTS IN COLUMN
 
-                n_points = f.read_f('l')
+                n_points = f.read_l()
 
-                self.logger.debug('n_points: {}'.format(n_points))
+                self.logger.debug('n_points: %s', n_points)
 
                 ##############################################
                 # COLUMN TYPE
@@ -634,13 +750,13 @@ class AxographRawIO(BaseRawIO):
                 if format_ver == 1 or format_ver == 2:
                     col_type = None
                 elif format_ver >= 3:
-                    col_type = f.read_f('l')
+                    col_type = f.read_l()
                 else:
                     raise NotImplementedError(
                         'unimplemented file format version "{}"!'.format(
                             format_ver))
 
-                self.logger.debug('col_type: {}'.format(col_type))
+                self.logger.debug('col_type: %s', col_type)
 
                 ##############################################
                 # COLUMN NAME AND UNITS
@@ -661,20 +777,21 @@ class AxographRawIO(BaseRawIO):
                         'unimplemented file format version "{}"!'.format(
                             format_ver))
 
-                self.logger.debug('title: {}'.format(title))
+                self.logger.debug('title: %s', title)
 
                 # units are given in parentheses at the end of a column title,
                 # unless units are absent
-                if len(title.split()) > 0 and title.split()[-1][0] == '(' and \
-                   title.split()[-1][-1] == ')':
-                    name = ' '.join(title.split()[:-1])
-                    units = title.split()[-1].strip('()')
+                title_words = title.split()
+                if title_words and title_words[-1].startswith('(') and \
+                   title_words[-1].endswith(')'):
+                    name = ' '.join(title_words[:-1])
+                    units = title_words[-1].strip('()')
                 else:
                     name = title
                     units = ''
 
-                self.logger.debug('name: {}'.format(name))
-                self.logger.debug('units: {}'.format(units))
+                self.logger.debug('name: %s', name)
+                self.logger.debug('units: %s', units)
 
                 ##############################################
                 # COLUMN DTYPE, SCALE, OFFSET
@@ -699,12 +816,10 @@ class AxographRawIO(BaseRawIO):
                         first_value, increment = f.read_f('ff')
 
                         self.logger.debug(
-                            'interval: {}, freq: {}'.format(
-                                increment, 1 / increment))
+                            'interval: %s, freq: %s', increment, 1 / increment)
                         self.logger.debug(
-                            'start: {}, end: {}'.format(
-                                first_value,
-                                first_value + increment * (n_points - 1)))
+                            'start: %s, end: %s', first_value,
+                            first_value + increment * (n_points - 1))
 
                         # assume this is the time column
                         t_start, sampling_period = first_value, increment
@@ -740,12 +855,10 @@ class AxographRawIO(BaseRawIO):
                         first_value, increment = f.read_f('dd')
 
                         self.logger.debug(
-                            'interval: {}, freq: {}'.format(
-                                increment, 1 / increment))
+                            'interval: %s, freq: %s', increment, 1 / increment)
                         self.logger.debug(
-                            'start: {}, end: {}'.format(
-                                first_value,
-                                first_value + increment * (n_points - 1)))
+                            'start: %s, end: %s', first_value,
+                            first_value + increment * (n_points - 1))
 
                         if i == 0:
 
@@ -764,28 +877,10 @@ class AxographRawIO(BaseRawIO):
                                 'series data are supported only for the first '
                                 'data column (time)!')
 
-                    elif col_type == 4:
-
-                        # short
-                        dtype = 'h'
-                        gain, offset = 1, 0  # data neither scaled nor off-set
-
-                    elif col_type == 5:
-
-                        # long
-                        dtype = 'l'
-                        gain, offset = 1, 0  # data neither scaled nor off-set
-
-                    elif col_type == 6:
+                    elif col_type in UNSCALED_COLUMN_DTYPES:
 
-                        # float
-                        dtype = 'f'
-                        gain, offset = 1, 0  # data neither scaled nor off-set
-
-                    elif col_type == 7:
-
-                        # double
-                        dtype = 'd'
+                        # short, long, float or double
+                        dtype = UNSCALED_COLUMN_DTYPES[col_type]
                         gain, offset = 1, 0  # data neither scaled nor off-set
 
                     elif col_type == 10:
@@ -808,17 +903,19 @@ class AxographRawIO(BaseRawIO):
                 ##############################################
                 # COLUMN MEMMAP AND CHANNEL INFO
 
-                # create a memory map that allows accessing parts of the file
-                # without loading it all into memory
-                array = np.memmap(
-                    self.filename,
-                    mode='r',
-                    dtype=f.byte_order + dtype,
-                    offset=f.tell(),
-                    shape=n_points)
+                # view the column in the memory map of the file, which allows
+                # accessing parts of the file without loading it all into
+                # memory
+                data_offset = f.tell()
+                n_bytes = n_points * np.dtype(f.byte_order + dtype).itemsize
+                if data_offset + n_bytes > file_memmap.size:
+                    raise ValueError('data of column {} extends beyond the end '
+                                     'of the file'.format(i))
+                array = file_memmap[data_offset:data_offset + n_bytes].view(
+                    f.byte_order + dtype)
 
                 # advance the file position to after the data array
-                f.seek(array.nbytes, 1)
+                f.seek(n_bytes, 1)
 
                 if i == 0:
                     # assume this is the time column containing n_points values
@@ -841,12 +938,10 @@ class AxographRawIO(BaseRawIO):
                     first_value = array[0]
 
                     self.logger.debug(
-                        'interval: {}, freq: {}'.format(
-                            increment, 1 / increment))
+                        'interval: %s, freq: %s', increment, 1 / increment)
                     self.logger.debug(
-                        'start: {}, end: {}'.format(
-                            first_value,
-                            first_value + increment * (n_points - 1)))
+                        'start: %s, end: %s', first_value,
+                        first_value + increment * (n_points - 1))
 
                     t_start, sampling_period = first_value, increment
                     self.info['t_start'] = t_start
@@ -859,28 +954,31 @@ class AxographRawIO(BaseRawIO):
                 else:
                     # not a time column
 
-                    self.logger.debug('gain: {}, offset: {}'.format(gain, offset))
-                    self.logger.debug('initial data: {}'.format(
-                        array[:5] * gain + offset))
+                    self.logger.debug('gain: %s, offset: %s', gain, offset)
+                    if self.logger.isEnabledFor(logging.DEBUG):
+                        self.logger.debug('initial data: %s',
+                                          array[:5] * gain + offset)
 
                     # channel_info will be cast to _signal_channel_dtype
                     channel_info = (
                         name, str(i), 1 / sampling_period, f.byte_order + dtype,
                         units, gain, offset, '0')
 
-                    self.logger.debug('channel_info: {}'.format(channel_info))
+                    self.logger.debug('channel_info: %s', channel_info)
                     self.logger.debug('')
 
                     sig_memmaps.append(array)
+                    sig_offsets.append(data_offset)
                     sig_channels.append(channel_info)
 
             # END COLUMNS
             ##############################################
 
-            # initialize lists for events and epochs
-            raw_event_timestamps = []
-            raw_epoch_timestamps = []
-            raw_epoch_durations = []
+            # initialize arrays and lists for events and epochs, with the
+            # dtypes they have when they are read
+            raw_event_timestamps = np.empty(0, dtype=int)
+            raw_epoch_timestamps = np.empty(0, dtype='f8')
+            raw_epoch_durations = np.empty(0, dtype='f8')
             event_labels = []
             epoch_labels = []
 
@@ -914,73 +1012,94 @@ class AxographRawIO(BaseRawIO):
 
                 self.logger.debug('== TRACES ==')
 
-                n_traces = f.read_f('l')
+                n_traces = f.read_l()
                 self.info['n_traces'] = n_traces
 
-                self.logger.debug('n_traces: {}'.format(n_traces))
+                self.logger.debug('n_traces: %s', n_traces)
                 self.logger.debug('')
 
-                trace_header_info_list = {}
-                group_ids = []
-                for i in range(n_traces):
-
-                    # AxoGraph traces are 1-indexed in GUI, so use i+1 below
-                    self.logger.debug('== TRACE #{} =='.format(i + 1))
-
-                    trace_header_info = {}
-
-                    if format_ver < 6:
-                        # before format version 6, there was only one version
-                        # of the header, and version numbers were not provided
-                        trace_header_info['trace_header_version'] = 1
-                    else:
-                        # for format versions 6 and later, the header version
-                        # must be read
-                        trace_header_info['trace_header_version'] = \
-                            f.read_f('l')
-
-                    if trace_header_info['trace_header_version'] == 1:
-                        TraceHeaderDescription = TraceHeaderDescriptionV1
-                    elif trace_header_info['trace_header_version'] == 2:
-                        TraceHeaderDescription = TraceHeaderDescriptionV2
-                    else:
-                        raise NotImplementedError(
-                            'unimplemented trace header version "{}"!'.format(
-                                trace_header_info['trace_header_version']))
-
-                    for key, fmt in TraceHeaderDescription:
-                        trace_header_info[key] = f.read_f(fmt)
-                    # AxoGraph traces are 1-indexed in GUI, so use i+1 below
-                    trace_header_info_list[i + 1] = trace_header_info
-                    group_ids.append(
-                        trace_header_info['group_id_for_this_trace'])
-
-                    self.logger.debug(trace_header_info)
-                    self.logger.debug('')
-                self.info['trace_header_info_list'] = trace_header_info_list
+                # trace headers have a fixed size and are stored back to back,
+                # so they are read into a structured array, with one record
+                # per trace (trace i+1 in the GUI is record i)
+                trace_header_parts = []  # (version, headers) pairs
+                if format_ver < 6:
+                    # before format version 6, there was only one version
+                    # of the header, and version numbers were not provided
+                    trace_header_parts.append(
+                        (1, f.read_array(TRACE_HEADER_DTYPES[1], n_traces)))
+                elif n_traces > 0:
+                    # for format versions 6 and later, each header is preceded
+                    # by its version, which is normally the same for every
+                    # trace, so first try to read them all at once with the
+                    # version of the first one
+                    start = f.tell()
+                    version = f.read_l()
+                    f.seek(start)
+                    if version in TRACE_HEADER_DTYPES:
+                        try:
+                            headers = f.read_array(
+                                _versioned_dtype(TRACE_HEADER_DTYPES[version]),
+                                n_traces)
+                        except EOFError:
+                            headers = None
+                        if headers is not None and np.all(
+                                headers['trace_header_version'] == version):
+                            trace_header_parts.append((version, headers))
+                        else:
+                            f.seek(start)
+
+                    if not trace_header_parts:
+                        # versions differ (or are unknown), so read the
+                        # headers one by one
+                        for i in range(n_traces):
+                            version = f.read_l()
+                            if version not in TRACE_HEADER_DTYPES:
+                                raise NotImplementedError(
+                                    'unimplemented trace header version '
+                                    '"{}"!'.format(version))
+                            trace_header_parts.append(
+                                (version, f.read_array(
+                                    TRACE_HEADER_DTYPES[version], 1)))
+
+                trace_headers = _combine_trace_headers(trace_header_parts)
+                versions = set(version for version, _ in trace_header_parts)
+                if n_traces > 0 and len(versions) == 1:
+                    self.info['trace_header_version'] = versions.pop()
+                self.info['trace_headers'] = trace_headers
+                self.info['trace_header_info_list'] = \
+                    _TraceHeaderInfoList(trace_headers)
+                group_ids = trace_headers['group_id_for_this_trace']
+
+                if self.logger.isEnabledFor(logging.DEBUG):
+                    for i, trace_header in enumerate(trace_headers.tolist()):
+                        # AxoGraph traces are 1-indexed in GUI, so use i+1
+                        self.logger.debug('== TRACE #%s ==', i + 1)
+                        self.logger.debug(
+                            dict(zip(trace_headers.dtype.names, trace_header)))
+                        self.logger.debug('')
 
                 ##############################################
                 # GROUPS
 
                 self.logger.debug('== GROUPS ==')
 
-                n_groups = f.read_f('l')
+                n_groups = f.read_l()
                 self.info['n_groups'] = n_groups
-                group_ids = \
-                    np.sort(list(set(group_ids)))  # remove duplicates and sort
+                group_ids = np.unique(
+                    np.asarray(group_ids, dtype=np.int64))  # dedupe and sort
                 assert n_groups == len(group_ids), \
                     'expected group_ids to have length {}: {}'.format(
                         n_groups, group_ids)
 
-                self.logger.debug('n_groups: {}'.format(n_groups))
-                self.logger.debug('group_ids: {}'.format(group_ids))
+                self.logger.debug('n_groups: %s', n_groups)
+                self.logger.debug('group_ids: %s', group_ids)
                 self.logger.debug('')
 
                 group_header_info_list = {}
                 for i in group_ids:
 
                     # AxoGraph groups are 0-indexed in GUI, so use i below
-                    self.logger.debug('== GROUP #{} =='.format(i))
+                    self.logger.debug('== GROUP #%s ==', i)
 
                     group_header_info = {}
 
@@ -992,22 +1111,24 @@ class AxographRawIO(BaseRawIO):
                         # for format versions 6 and later, the header version
                         # must be read
                         group_header_info['group_header_version'] = \
-                            f.read_f('l')
+                            f.read_l()
 
                     if group_header_info['group_header_version'] == 1:
-                        GroupHeaderDescription = GroupHeaderDescriptionV1
+                        GroupHeaderDescription = \
+                            CompiledGroupHeaderDescriptionV1
                     else:
                         raise NotImplementedError(
                             'unimplemented group header version "{}"!'.format(
                                 group_header_info['group_header_version']))
 
-                    for key, fmt in GroupHeaderDescription:
-                        group_header_info[key] = f.read_f(fmt)
+                    group_header_info.update(
+                        f.read_description(GroupHeaderDescription))
                     # AxoGraph groups are 0-indexed in GUI, so use i below
                     group_header_info_list[i] = group_header_info
 
-                    self.logger.debug(group_header_info)
-                    self.logger.debug('')
+                    if self.logger.isEnabledFor(logging.DEBUG):
+                        self.logger.debug(group_header_info)
+                        self.logger.debug('')
                 self.info['group_header_info_list'] = group_header_info_list
 
                 ##############################################
@@ -1029,69 +1150,52 @@ class AxographRawIO(BaseRawIO):
                 # a subset of episodes can be selected for "review", or
                 # episodes can be paged through one by one, and the indexes of
                 # those currently in review appear in this list
-                episodes_in_review = []
-                n_episodes = f.read_f('l')
+                n_episodes = f.read_l()
                 self.info['n_episodes'] = n_episodes
-                for i in range(n_episodes):
-                    episode_bool = f.read_f('Z')
-                    if episode_bool:
-                        episodes_in_review.append(i + 1)
+                episodes_in_review = f.read_episode_list(n_episodes)
                 self.info['episodes_in_review'] = episodes_in_review
 
-                self.logger.debug('n_episodes: {}'.format(n_episodes))
-                self.logger.debug('episodes_in_review: {}'.format(
-                    episodes_in_review))
+                self.logger.debug('n_episodes: %s', n_episodes)
+                self.logger.debug('episodes_in_review: %s',
+                                  episodes_in_review)
 
                 if format_ver == 5:
 
                     # the test file for version 5 contains this extra list of
                     # episode indexes with unknown purpose
-                    old_unknown_episode_list = []
-                    n_episodes2 = f.read_f('l')
-                    for i in range(n_episodes2):
-                        episode_bool = f.read_f('Z')
-                        if episode_bool:
-                            old_unknown_episode_list.append(i + 1)
-
-                    self.logger.debug('old_unknown_episode_list: {}'.format(
-                        old_unknown_episode_list))
+                    n_episodes2 = f.read_l()
+                    old_unknown_episode_list = f.read_episode_list(n_episodes2)
+
+                    self.logger.debug('old_unknown_episode_list: %s',
+                                      old_unknown_episode_list)
                     if n_episodes2 != n_episodes:
                         self.logger.debug(
-                            'n_episodes2 ({}) and n_episodes ({}) '
-                            'differ!'.format(n_episodes2, n_episodes))
+                            'n_episodes2 (%s) and n_episodes (%s) differ!',
+                            n_episodes2, n_episodes)
 
                 # another list of episode indexes with unknown purpose
-                unknown_episode_list = []
-                n_episodes3 = f.read_f('l')
-                for i in range(n_episodes3):
-                    episode_bool = f.read_f('Z')
-                    if episode_bool:
-                        unknown_episode_list.append(i + 1)
-
-                self.logger.debug('unknown_episode_list: {}'.format(
-                    unknown_episode_list))
+                n_episodes3 = f.read_l()
+                unknown_episode_list = f.read_episode_list(n_episodes3)
+
+                self.logger.debug('unknown_episode_list: %s',
+                                  unknown_episode_list)
                 if n_episodes3 != n_episodes:
                     self.logger.debug(
-                        'n_episodes3 ({}) and n_episodes ({}) '
-                        'differ!'.format(n_episodes3, n_episodes))
+                        'n_episodes3 (%s) and n_episodes (%s) differ!',
+                        n_episodes3, n_episodes)
 
                 # episodes can be masked to be removed from the pool of
                 # reviewable episodes completely until unmasked, and the
                 # indexes of those currently masked appear in this list
-                masked_episodes = []
-                n_episodes4 = f.read_f('l')
-                for i in range(n_episodes4):
-                    episode_bool = f.read_f('Z')
-                    if episode_bool:
-                        masked_episodes.append(i + 1)
+                n_episodes4 = f.read_l()
+                masked_episodes = f.read_episode_list(n_episodes4)
                 self.info['masked_episodes'] = masked_episodes
 
-                self.logger.debug('masked_episodes: {}'.format(
-                    masked_episodes))
+                self.logger.debug('masked_episodes: %s', masked_episodes)
                 if n_episodes4 != n_episodes:
                     self.logger.debug(
-                        'n_episodes4 ({}) and n_episodes ({}) '
-                        'differ!'.format(n_episodes4, n_episodes))
+                        'n_episodes4 (%s) and n_episodes (%s) differ!',
+                        n_episodes4, n_episodes)
                 self.logger.debug('')
 
                 ##############################################
@@ -1119,11 +1223,10 @@ class AxographRawIO(BaseRawIO):
                 font_settings_info_list = {}
                 for i in font_categories:
 
-                    self.logger.debug('== FONT SETTINGS FOR {} =='.format(i))
+                    self.logger.debug('== FONT SETTINGS FOR %s ==', i)
 
-                    font_settings_info = {}
-                    for key, fmt in FontSettingsDescription:
-                        font_settings_info[key] = f.read_f(fmt)
+                    font_settings_info = f.read_description(
+                        CompiledFontSettingsDescription)
 
                     # I don't know why two arbitrary values were selected to
                     # represent this switch, but it seems they were
@@ -1159,9 +1262,8 @@ class AxographRawIO(BaseRawIO):
 
                 self.logger.debug('== X-AXIS SETTINGS ==')
 
-                x_axis_settings_info = {}
-                for key, fmt in XAxisSettingsDescription:
-                    x_axis_settings_info[key] = f.read_f(fmt)
+                x_axis_settings_info = f.read_description(
+                    CompiledXAxisSettingsDescription)
                 self.info['x_axis_settings_info'] = x_axis_settings_info
 
                 self.logger.debug(x_axis_settings_info)
@@ -1186,31 +1288,27 @@ class AxographRawIO(BaseRawIO):
                 n_events, n_events_again = f.read_f('ll')
                 self.info['n_events'] = n_events
 
-                self.logger.debug('n_events: {}'.format(n_events))
+                self.logger.debug('n_events: %s', n_events)
 
                 # event / tag timing is stored as an index into time
-                raw_event_timestamps = []
-                event_labels = []
-                for i in range(n_events_again):
-                    event_index = f.read_f('l')
-                    raw_event_timestamps.append(event_index)
-                n_events_yet_again = f.read_f('l')
-                for i in range(n_events_yet_again):
-                    title = f.read_f('S')
-                    event_labels.append(title)
+                raw_event_timestamps = f.read_array(
+                    'i4', n_events_again).astype(int)
+                n_events_yet_again = f.read_l()
+                event_labels = f.read_strings(n_events_yet_again)
 
+                # t_start shouldn't be added here
+                event_times = raw_event_timestamps * sampling_period
                 event_list = []
-                for event_label, event_index in \
-                        zip(event_labels, raw_event_timestamps):
-                    # t_start shouldn't be added here
-                    event_time = event_index * sampling_period
+                for event_label, event_index, event_time in zip(
+                        event_labels, raw_event_timestamps.tolist(),
+                        event_times.tolist()):
                     event_list.append({
                         'title': event_label,
                         'index': event_index,
                         'time': event_time})
                 self.info['event_list'] = event_list
-                for event in event_list:
-                    self.logger.debug(event)
+                if self.logger.isEnabledFor(logging.DEBUG) and event_list:
+                    self.logger.debug('\n'.join(map(str, event_list)))
                 self.logger.debug('')
 
                 ##############################################
@@ -1229,16 +1327,15 @@ class AxographRawIO(BaseRawIO):
 
                 self.logger.debug('=== EPOCHS / INTERVAL BARS ===')
 
-                n_epochs = f.read_f('l')
+                n_epochs = f.read_l()
                 self.info['n_epochs'] = n_epochs
 
-                self.logger.debug('n_epochs: {}'.format(n_epochs))
+                self.logger.debug('n_epochs: %s', n_epochs)
 
                 epoch_list = []
                 for i in range(n_epochs):
-                    epoch_info = {}
-                    for key, fmt in EpochInfoDescription:
-                        epoch_info[key] = f.read_f(fmt)
+                    epoch_info = f.read_description(
+                        CompiledEpochInfoDescription, EpochInfo)
                     epoch_list.append(epoch_info)
                 self.info['epoch_list'] = epoch_list
 
@@ -1246,16 +1343,16 @@ class AxographRawIO(BaseRawIO):
                 # seconds, so here they are converted to (possibly non-integer)
                 # indexes into time to fit into the procrustean beds of
                 # _rescale_event_timestamp and _rescale_epoch_duration
-                raw_epoch_timestamps = []
-                raw_epoch_durations = []
-                epoch_labels = []
-                for epoch in epoch_list:
-                    raw_epoch_timestamps.append(
-                        epoch['t_start'] / sampling_period)
-                    raw_epoch_durations.append(
-                        (epoch['t_stop'] - epoch['t_start']) / sampling_period)
-                    epoch_labels.append(epoch['title'])
-                    self.logger.debug(epoch)
+                epoch_t_starts = np.array(
+                    [epoch.t_start for epoch in epoch_list], dtype='f8')
+                epoch_t_stops = np.array(
+                    [epoch.t_stop for epoch in epoch_list], dtype='f8')
+                raw_epoch_timestamps = epoch_t_starts / sampling_period
+                raw_epoch_durations = \
+                    (epoch_t_stops - epoch_t_starts) / sampling_period
+                epoch_labels = [epoch.title for epoch in epoch_list]
+                if self.logger.isEnabledFor(logging.DEBUG) and epoch_list:
+                    self.logger.debug('\n'.join(map(str, epoch_list)))
                 self.logger.debug('')
 
                 ##############################################
@@ -1264,10 +1361,10 @@ class AxographRawIO(BaseRawIO):
                 self.logger.debug(
                     '>> UNKNOWN 5 (includes y-axis plot ranges) <<')
 
-                # lots of undeciphered data
-                rest_of_the_file = f.read()
-
-                self.logger.debug(rest_of_the_file)
+                # lots of undeciphered data, which is only read for debugging
+                if self.logger.isEnabledFor(logging.DEBUG):
+                    rest_of_the_file = f.read()
+                    self.logger.debug(rest_of_the_file)
                 self.logger.debug('')
 
                 self.logger.debug('End of file reached (expected)')
@@ -1329,29 +1426,84 @@ class AxographRawIO(BaseRawIO):
         self._sampling_period = sampling_period
         self._t_start = t_start
         self._raw_signals = [sig_memmaps]  # first index is seg_index
+        self._file_memmap = file_memmap
+        self._raw_signals_2d = [self._stack_signals(sig_memmaps, sig_offsets)]
         self._raw_event_epoch_timestamps = [
-            np.array(raw_event_timestamps),
-            np.array(raw_epoch_timestamps)]
+            raw_event_timestamps,
+            raw_epoch_timestamps]
         self._raw_event_epoch_durations = [
             None,
-            np.array(raw_epoch_durations)]
+            raw_epoch_durations]
         self._event_epoch_labels = [
-            np.array(event_labels, dtype='U'),
-            np.array(epoch_labels, dtype='U')]
+            _label_array(event_labels),
+            _label_array(epoch_labels)]
+
+
+_struct_cache = {}
+
+
+def _get_struct(fmt):
+    """
+    Return a compiled struct.Struct for the format string, so that it is
+    parsed only once however many times it is used
+    """
+    try:
+        return _struct_cache[fmt]
+    except KeyError:
+        s = _struct_cache[fmt] = Struct(fmt)
+        return s
+
+
+def _label_array(labels):
+    """
+    Convert a list of strings to a unicode array, sized from the longest
+    string up front so that numpy need not discover the itemsize itself
+    """
+    max_length = max(map(len, labels), default=0)
+    return np.array(labels, dtype='U{}'.format(max(max_length, 1)))
+
+
+_special_formats_cache = {}
+
 
+def _split_special_formats(fmt):
+    """
+    Split a StructFile.read_f format string into isolated 'S' and 'Z' formats
+    and the runs of struct formats between them, caching the result so that
+    each format string is split only once
+    """
+    try:
+        return _special_formats_cache[fmt]
+    except KeyError:
+        pass
+
+    # place commas before and after each instance of S or Z
+    split_fmt = fmt
+    for special in ['S', 'Z']:
+        split_fmt = split_fmt.replace(special, ',' + special + ',')
+
+    # split S and Z into isolated strings, dropping empty runs
+    split_fmt = tuple(subfmt for subfmt in split_fmt.split(',') if subfmt)
+
+    _special_formats_cache[fmt] = split_fmt
+    return split_fmt
 
-class StructFile(BufferedReader):
+
+class StructFile:
     """
-    A container for the file buffer with some added convenience functions for
-    reading AxoGraph files
+    A cursor over the bytes of an AxoGraph file, held in memory or memory
+    mapped, with some added convenience functions for reading AxoGraph files.
+    Values are unpacked directly from the buffer, without copying the bytes
+    of each field, and the cursor mimics the read, tell and seek methods of a
+    file object.
     """
 
-    def __init__(self, *args, **kwargs):
+    def __init__(self, buffer, byte_order='>'):
         # As far as I've seen, every AxoGraph file uses big-endian encoding,
         # regardless of the system architecture on which it was created, but
         # here I provide means for controlling byte ordering in case a counter
         # example is found.
-        self.byte_order = kwargs.pop('byte_order', '>')
+        self.byte_order = byte_order
         if self.byte_order == '>':
             # big-endian
             self.utf_16_decoder = 'utf-16-be'
@@ -1361,22 +1513,69 @@ class StructFile(BufferedReader):
         else:
             # unspecified
             self.utf_16_decoder = 'utf-16'
-        super().__init__(*args, **kwargs)
+        # look the codec up once, rather than by name for every string
+        self._utf_16_decode = codecs.getdecoder(self.utf_16_decoder)
+        self.buffer = memoryview(buffer).cast('B')
+        self.pos = 0
+        # compiled structs keyed by format string without byte order prefix
+        self._structs = {}
+        self._long_struct = self.get_struct('l')
+
+    def read(self, size=-1):
+        """
+        Read up to size bytes, or all remaining bytes if size is negative
+        """
+        start = min(self.pos, len(self.buffer))
+        if size is None or size < 0:
+            stop = len(self.buffer)
+        else:
+            stop = min(start + size, len(self.buffer))
+        self.pos = max(self.pos, stop)
+        return self.buffer[start:stop].tobytes()
+
+    def tell(self):
+        return self.pos
+
+    def seek(self, offset, whence=0):
+        if whence == 0:
+            self.pos = offset
+        elif whence == 1:
+            self.pos += offset
+        elif whence == 2:
+            self.pos = len(self.buffer) + offset
+        else:
+            raise ValueError('invalid whence ({})'.format(whence))
+        return self.pos
 
-    def read_and_unpack(self, fmt):
+    def get_struct(self, fmt):
         """
-        Calculate the number of bytes corresponding to the format string, read
-        in that number of bytes, and unpack them according to the format string
+        Return the compiled struct.Struct for the format string in the byte
+        order of this file
         """
         try:
-            return unpack(
-                self.byte_order + fmt,
-                self.read(calcsize(self.byte_order + fmt)))
-        except Exception as e:
-            if e.args[0].startswith('unpack requires a buffer of'):
-                raise EOFError(e)
-            else:
-                raise
+            return self._structs[fmt]
+        except KeyError:
+            s = self._structs[fmt] = _get_struct(self.byte_order + fmt)
+            return s
+
+    def read_and_unpack(self, fmt):
+        """
+        Unpack the number of bytes corresponding to the format string from the
+        current position, according to the format string, and advance past them
+        """
+        return self.read_struct(self.get_struct(fmt))
+
+    def read_struct(self, s):
+        """
+        Unpack the number of bytes corresponding to the compiled struct.Struct
+        from the current position, and advance past them
+        """
+        if self.pos + s.size > len(self.buffer):
+            self.pos = max(self.pos, len(self.buffer))
+            raise EOFError('unpack requires a buffer of {} bytes'.format(s.size))
+        data = s.unpack_from(self.buffer, self.pos)
+        self.pos += s.size
+        return data
 
     def read_string(self):
         """
@@ -1388,19 +1587,112 @@ class StructFile(BufferedReader):
         length strings
         """
 
-        # length may be -1, 0, or a positive integer
-        length = self.read_and_unpack('l')[0]
-        if length > 0:
-            return self.read(length).decode(self.utf_16_decoder)
-        else:
-            return ''
+        return self.read_strings(1)[0]
+
+    def read_strings(self, n_strings):
+        """
+        Read n_strings consecutive variable length strings (see read_string)
+        into a list, decoding each directly from the buffer
+        """
+
+        length_struct = self._long_struct
+        decode = self._utf_16_decode
+        buffer, pos = self.buffer, self.pos
+        strings = []
+        for i in range(n_strings):
+            if pos + length_struct.size > len(buffer):
+                self.pos = max(pos, len(buffer))
+                raise EOFError('unpack requires a buffer of {} bytes'.format(
+                    length_struct.size))
+            # length may be -1, 0, or a positive integer
+            length = length_struct.unpack_from(buffer, pos)[0]
+            pos += length_struct.size
+            if length > 0:
+                self.pos = pos
+                strings.append(decode(buffer[pos:pos + length])[0])
+                pos = min(pos + length, len(buffer))
+            else:
+                strings.append('')
+        self.pos = pos
+        return strings
+
+    def read_l(self):
+        """
+        Read a single 4-byte integer (long), the format of most counts in
+        AxoGraph files, without the format parsing done by read_f
+        """
+        return self.read_struct(self._long_struct)[0]
 
     def read_bool(self):
         """
         AxoGraph files encode each boolean as 4-byte integer (long) with value
         1 = True, 0 = False. This function reads in one of these booleans.
         """
-        return bool(self.read_and_unpack('l')[0])
+        return bool(self.read_l())
+
+    def read_episode_list(self, n_episodes):
+        """
+        Episode lists are stored as n_episodes consecutive booleans (see
+        read_bool), one for each episode. This function reads them all at once
+        and returns the (1-indexed) numbers of the episodes that are True.
+        """
+
+        episode_bools = self.read_array('i4', n_episodes)
+        return (np.flatnonzero(episode_bools) + 1).tolist()
+
+    def read_array(self, dtype, count):
+        """
+        Read count consecutive values of a fixed-size numpy dtype, such as
+        'i4' for longs, into an array at once. The byte order is prepended to
+        dtype, which should therefore not specify its own. Use sized dtypes:
+        numpy's 'l' is not the same size as struct's 'l' on every platform.
+        A np.dtype, such as a structured dtype from _description_dtype, is
+        used as is and must carry its own byte order.
+        """
+
+        if isinstance(dtype, str):
+            dtype = np.dtype(self.byte_order + dtype)
+        count = max(count, 0)
+        n_bytes = dtype.itemsize * count
+        if self.pos + n_bytes > len(self.buffer):
+            self.pos = max(self.pos, len(self.buffer))
+            raise EOFError('array requires a buffer of {} bytes'.format(n_bytes))
+        array = np.frombuffer(self.buffer, dtype=dtype, count=count,
+                              offset=self.pos)
+        self.pos += n_bytes
+        return array
+
+    def read_description(self, compiled_description, record_type=None):
+        """
+        Read a header described by a list of (key, fmt) pairs, such as
+        TraceHeaderDescriptionV1, into a dict. The description must first be
+        compiled with _compile_description in the byte order of this file, so
+        that each run of fixed-size fields is read and unpacked at once. The
+        values are the same as those that read_f would return for each field
+        separately. If record_type is given, such as EpochInfo, the values are
+        instead returned as an instance of that namedtuple, whose fields must
+        match the keys of the description.
+        """
+
+        keys, segments = compiled_description
+        values = []
+        for struct, fields in segments:
+            if struct is None:
+                values.append(self.read_string())
+                continue
+            data = self.read_struct(struct)
+            i = 0
+            for n_values, is_bool in fields:
+                if is_bool:
+                    values.append(bool(data[i]))
+                elif n_values == 1:
+                    values.append(data[i])
+                else:
+                    values.append(data[i:i + n_values])
+                i += n_values
+        if record_type is not None:
+            return record_type._make(values)
+        return dict(zip(keys, values))
 
     def read_f(self, fmt, offset=None):
         """
@@ -1415,22 +1707,21 @@ class StructFile(BufferedReader):
         if offset is not None:
             self.seek(offset)
 
-        # place commas before and after each instance of S or Z
-        for special in ['S', 'Z']:
-            fmt = fmt.replace(special, ',' + special + ',')
-
-        # split S and Z into isolated strings
-        fmt = fmt.split(',')
-
-        # construct a tuple of unpacked data
-        data = ()
-        for subfmt in fmt:
-            if subfmt == 'S':
-                data += (self.read_string(),)
-            elif subfmt == 'Z':
-                data += (self.read_bool(),)
-            else:
-                data += self.read_and_unpack(subfmt)
+        subfmts = _split_special_formats(fmt)
+        if len(subfmts) == 1 and subfmts[0] not in ('S', 'Z'):
+            # a single run of struct formats, the most common case
+            data = self.read_and_unpack(subfmts[0])
+        else:
+            # construct a tuple of unpacked data
+            data = []
+            for subfmt in subfmts:
+                if subfmt == 'S':
+                    data.append(self.read_string())
+                elif subfmt == 'Z':
+                    data.append(self.read_bool())
+                else:
+                    data.extend(self.read_and_unpack(subfmt))
+            data = tuple(data)
 
         if len(data) == 1:
             return data[0]
@@ -1438,6 +1729,175 @@ class StructFile(BufferedReader):
             return data
 
 
+def _compile_description(description, byte_order='>'):
+    """
+    Prepare a header description, a list of (key, fmt) pairs, for use with
+    StructFile.read_description. Consecutive fixed-size fields are merged
+    into a single struct.Struct in the given byte order, with 'Z' booleans
+    read as 4-byte integers, while 'S' strings (which have variable length)
+    are kept separate. Returns a tuple of the keys, in order, and a list of
+    (struct, fields) segments, where either struct is None for a string and
+    fields is None, or fields lists a (n_values, is_bool) tuple for each of
+    the fields the struct contains.
+    """
+
+    keys = tuple(key for key, fmt in description)
+    runs = []
+    for key, fmt in description:
+        if fmt == 'S':
+            runs.append(('S', None))
+            continue
+
+        if fmt == 'Z':
+            fmt, n_values, is_bool = 'l', 1, True
+        elif 'S' in fmt or 'Z' in fmt:
+            raise NotImplementedError(
+                'format "{}" mixes S or Z with other formats!'.format(fmt))
+        else:
+            s = Struct(byte_order + fmt)
+            n_values, is_bool = len(s.unpack(bytes(s.size))), False
+
+        if not runs or runs[-1][0] == 'S':
+            runs.append(('', []))
+        run_fmt, fields = runs[-1]
+        fields.append((n_values, is_bool))
+        runs[-1] = (run_fmt + fmt, fields)
+
+    segments = [(None, None) if fmt == 'S' else (Struct(byte_order + fmt), fields)
+                for fmt, fields in runs]
+    return keys, segments
+
+
+# numpy types of the struct formats used in fixed-size header fields, with
+# 'Z' booleans kept as 4-byte integers
+_FIELD_TYPES = {'Z': 'i4', 'b': 'i1', 'B': 'u1', 'h': 'i2', 'l': 'i4',
+                'f': 'f4', 'd': 'f8'}
+
+
+def _description_dtype(description, byte_order='>'):
+    """
+    Build a structured numpy dtype for a header description of fixed-size
+    fields, such as TraceHeaderDescriptionV1, so that many headers stored back
+    to back can be read at once with StructFile.read_array. A field may begin
+    with 'x' pad bytes, and otherwise holds one value or several values of the
+    same type (e.g. 'xBBB'), in which case it is a subarray.
+    """
+
+    names, formats, offsets = [], [], []
+    itemsize = 0
+    for key, fmt in description:
+        n_pad = len(fmt) - len(fmt.lstrip('x'))
+        value_fmt = fmt[n_pad:]
+        if not value_fmt or value_fmt.strip(value_fmt[0]) or \
+                value_fmt[0] not in _FIELD_TYPES:
+            raise NotImplementedError(
+                'format "{}" cannot be read as a numpy field!'.format(fmt))
+        field_dtype = np.dtype(byte_order + _FIELD_TYPES[value_fmt[0]])
+        if len(value_fmt) > 1:
+            field_dtype = np.dtype((field_dtype, (len(value_fmt),)))
+        names.append(key)
+        formats.append(field_dtype)
+        offsets.append(itemsize + n_pad)
+        itemsize += n_pad + field_dtype.itemsize
+    return np.dtype({'names': names, 'formats': formats, 'offsets': offsets,
+                     'itemsize': itemsize})
+
+
+def _versioned_dtype(header_dtype, byte_order='>'):
+    """
+    Return the structured dtype of a header preceded by its 4-byte version
+    number, in a 'trace_header_version' field, as trace headers are stored
+    for format versions 6 and later
+    """
+
+    names = ['trace_header_version'] + list(header_dtype.names)
+    formats = [np.dtype(byte_order + 'i4')] + \
+        [header_dtype.fields[name][0] for name in header_dtype.names]
+    offsets = [0] + [4 + header_dtype.fields[name][1]
+                     for name in header_dtype.names]
+    return np.dtype({'names': names, 'formats': formats, 'offsets': offsets,
+                     'itemsize': 4 + header_dtype.itemsize})
+
+
+def _combine_trace_headers(trace_header_parts):
+    """
+    Gather trace headers, given as (version, headers) pairs where headers is
+    a structured array of consecutive headers of that version, into a single
+    array in native byte order. It has a 'trace_header_version' field and the
+    fields of the latest version present, where fields that an earlier
+    version lacks (i.e. neg_err_bar_index for version 1) are set to -1.
+    """
+
+    versions = [version for version, _ in trace_header_parts]
+    header_dtype = TRACE_HEADER_DTYPES[max(versions, default=1)]
+    combined = np.zeros(sum(len(headers) for _, headers in trace_header_parts),
+                        dtype=_versioned_dtype(header_dtype).newbyteorder('='))
+    i = 0
+    for version, headers in trace_header_parts:
+        part = combined[i:i + len(headers)]
+        part['trace_header_version'] = version
+        for name in header_dtype.names:
+            if name in headers.dtype.names:
+                part[name] = headers[name]
+            else:
+                part[name] = -1
+        i += len(headers)
+    return combined
+
+
+class _TraceHeaderInfoList(Mapping):
+    """
+    Deprecated read-only view of trace headers, a structured array as
+    returned by _combine_trace_headers, in their previous form: a mapping from
+    the 1-based trace number to a dict of the entries of that trace header
+    """
+
+    def __init__(self, trace_headers):
+        self._trace_headers = trace_headers
+
+    def _warn(self):
+        warnings.warn(
+            "info['trace_header_info_list'] is deprecated, use the structured "
+            "array info['trace_headers'] instead, whose record i is trace i+1",
+            DeprecationWarning, stacklevel=3)
+
+    def __getitem__(self, trace_number):
+        self._warn()
+        if not isinstance(trace_number, (int, np.integer)) or \
+                not 1 <= trace_number <= len(self._trace_headers):
+            raise KeyError(trace_number)
+        record = self._trace_headers[trace_number - 1]
+        version = int(record['trace_header_version'])
+        trace_header_info = {'trace_header_version': version}
+        for key, fmt in TRACE_HEADER_DESCRIPTIONS[version]:
+            value = record[key]
+            if fmt == 'Z':
+                trace_header_info[key] = bool(value)
+            elif value.shape:
+                trace_header_info[key] = tuple(value.tolist())
+            else:
+                trace_header_info[key] = value.item()
+        return trace_header_info
+
+    def __iter__(self):
+        self._warn()
+        return iter(range(1, len(self._trace_headers) + 1))
+
+    def __len__(self):
+        return len(self._trace_headers)
+
+    def __repr__(self):
+        return '{}({} traces)'.format(type(self).__name__, len(self))
+
+
+# column types whose data is neither scaled nor off-set, and their dtypes
+UNSCALED_COLUMN_DTYPES = {
+    4: 'h',  # short
+    5: 'l',  # long
+    6: 'f',  # float
+    7: 'd',  # double
+}
+
 FONT_BOLD = 75      # mysterious arbitrary constant
 FONT_NOT_BOLD = 50  # mysterious arbitrary constant
 FONT_ITALICS = 1
@@ -1522,3 +1982,22 @@ EpochInfoDescription = [
     ('t_stop', 'd'),
     ('y_pos', 'd'),
 ]
+
+# epochs / interval bars are not modified after they are read, so they are
+# kept as lightweight tuples with the fields of EpochInfoDescription
+EpochInfo = namedtuple('EpochInfo', [key for key, fmt in EpochInfoDescription])
+
+# trace headers, by version
+TRACE_HEADER_DESCRIPTIONS = {
+    1: TraceHeaderDescriptionV1,
+    2: TraceHeaderDescriptionV2,
+}
+TRACE_HEADER_DTYPES = {
+    version: _description_dtype(description)
+    for version, description in TRACE_HEADER_DESCRIPTIONS.items()
+}
+
+CompiledGroupHeaderDescriptionV1 = _compile_description(GroupHeaderDescriptionV1)
+CompiledFontSettingsDescription = _compile_description(FontSettingsDescription)
+CompiledXAxisSettingsDescription = _compile_description(XAxisSettingsDescription)
+CompiledEpochInfoDescription = _compile_description(EpochInfoDescription)
@@ -0,0 +1,129 @@
+"""
+Tests of the io registry in neo.io
+"""
+
+import os
+import subprocess
+import sys
+import tempfile
+import unittest
+
+import neo.io
+from neo.io import get_io, _IO_REGISTRY, _get_ext_index, _get_extensions
+from neo.io.axonio import AxonIO
+
+
+class TestLazyImport(unittest.TestCase):
+    def test__import_neo_io_does_not_import_ios(self):
+        code = ('import sys, neo.io; '
+                'sys.exit("neo.io.axonio" in sys.modules)')
+        self.assertEqual(subprocess.call([sys.executable, '-c', code]), 0)
+
+    def test__import_neo_io_does_not_probe_neuroshare(self):
+        code = ('import sys, neo.io; '
+                'sys.exit("neo.io.neurosharectypesio" in sys.modules)')
+        self.assertEqual(subprocess.call([sys.executable, '-c', code]), 0)
+
+    def test__neuroshareio(self):
+        self.assertIn(neo.io.NeuroshareIO.__name__,
+                      ('NeurosharectypesIO', 'NeuroshareapiIO'))
+
+    def test__io_classes_are_resolved_on_access(self):
+        self.assertIs(neo.io.AxonIO, AxonIO)
+        self.assertIs(neo.AxonIO, AxonIO)
+        self.assertIn('AxonIO', dir(neo.io))
+        self.assertIn('AxonIO', neo.io.__all__)
+        # resolved classes are cached, not stored in the module namespace
+        self.assertNotIn('AxonIO', vars(neo.io))
+
+    def test__unknown_attribute_raises_attribute_error(self):
+        self.assertRaises(AttributeError, getattr, neo.io, 'NotAnIO')
+        self.assertRaises(AttributeError, getattr, neo, 'NotAnIO')
+        # only the public names of neo.io are forwarded by neo
+        for name in ('_IO_REGISTRY', 'proxyobjects', 'os'):
+            self.assertRaises(AttributeError, getattr, neo, name)
+        self.assertIn('Block', neo.__all__)
+
+    def test__star_import_binds_core_classes(self):
+        namespace = {}
+        exec('from neo import *', namespace)
+        for name in ('Block', 'Segment', 'AnalogSignal', 'get_io'):
+            self.assertIn(name, namespace)
+
+    def test__star_import_binds_ios(self):
+        namespace = {}
+        exec('from neo import *', namespace)
+        self.assertIs(namespace['AxonIO'], AxonIO)
+        self.assertIs(namespace['NixIO'], neo.io.NixIO)
+        self.assertEqual(namespace['iolist'], neo.io.iolist)
+
+    def test__import_does_not_import_ios(self):
+        code = ('import sys; import neo; '
+                'sys.exit("neo.io.axonio" in sys.modules)')
+        self.assertEqual(subprocess.call([sys.executable, '-c', code]), 0)
+
+    def test__iolist(self):
+        self.assertIn(AxonIO, neo.io.iolist)
+
+
+class TestGetIO(unittest.TestCase):
+    def test__registry_matches_io_extensions(self):
+        for io_name, extensions in _IO_REGISTRY:
+            io_class = getattr(neo.io, io_name)
+            self.assertEqual(frozenset(ext.lower() for ext in io_class.extensions),
+                             extensions, io_name)
+
+    def test__get_io_imports_only_the_matching_io(self):
+        code = ('import sys, neo.io; '
+                'io = neo.io.get_io("file.fake"); '
+                'sys.exit(type(io).__name__ != "ExampleIO" '
+                '         or "neo.io.axonio" in sys.modules)')
+        self.assertEqual(subprocess.call([sys.executable, '-c', code]), 0)
+
+    def test__get_extensions(self):
+        self.assertEqual(_get_extensions('file.abf'), ['abf'])
+        self.assertEqual(_get_extensions('path/to/FILE.ABF'), ['abf'])
+        self.assertEqual(_get_extensions('path.d/file'), [])
+        self.assertEqual(_get_extensions('path.d\\file'), [])
+        self.assertEqual(_get_extensions('file'), [])
+        self.assertEqual(_get_extensions('file.nwb.h5'), ['nwb.h5', 'h5'])
+        self.assertEqual(_get_extensions('a.b.c.d.e'), ['c.d.e', 'd.e', 'e'])
+        # dotfiles have no extension, as with os.path.splitext
+        self.assertEqual(_get_extensions('.abf'), [])
+        self.assertEqual(_get_extensions('dir.x/..abf'), [])
+        self.assertEqual(_get_extensions('.hidden.abf'), ['abf'])
+
+    def test__compound_extension_falls_back_to_last_suffix(self):
+        self.assertIsInstance(get_io('file.v2.fake'), neo.io.ExampleIO)
+
+    def test__h5_ios_keep_iolist_order(self):
+        # MEArecIO comes before NixIO in iolist, so it is tried first
+        self.assertEqual(_get_ext_index()['h5'][:2], ('MEArecIO', 'NixIO'))
+
+    def test__extension_lookup_is_case_insensitive(self):
+        self.assertIsInstance(get_io('file.FAKE'), neo.io.ExampleIO)
+
+    def test__cache(self):
+        with tempfile.TemporaryDirectory() as tmpdir:
+            filename = os.path.join(tmpdir, 'file.fake')
+            open(filename, 'w').close()
+            io = get_io(filename, reuse_io=True)
+            self.assertIs(get_io(filename, reuse_io=True), io)
+            self.assertIsNot(get_io(filename), io)
+
+            # modifying the file invalidates the cached io
+            stat = os.stat(filename)
+            os.utime(filename, ns=(stat.st_atime_ns, stat.st_mtime_ns + 10 ** 9))
+            self.assertIsNot(get_io(filename, reuse_io=True), io)
+
+    def test__reuse_io_is_not_passed_to_io(self):
+        # ExampleIO takes no keyword argument other than filename
+        self.assertIsInstance(get_io('file.fake', reuse_io=False), neo.io.ExampleIO)
+        self.assertRaises(TypeError, get_io, 'file.fake', cache=True)
+
+    def test__unknown_extension_raises_ioerror(self):
+        self.assertRaises(IOError, get_io, 'file.not_an_extension')
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -2,9 +2,22 @@
 Tests of neo.rawio.axographrawio
 """
 
+import os
+import tempfile
 import unittest
+import warnings
+from struct import Struct
 
-from neo.rawio.axographrawio import AxographRawIO
+import numpy as np
+
+from neo.rawio.axographrawio import (
+    AxographRawIO, StructFile, EpochInfo, TRACE_HEADER_DESCRIPTIONS,
+    TRACE_HEADER_DTYPES,
+    _compile_description, _description_dtype,
+    TraceHeaderDescriptionV1, TraceHeaderDescriptionV2,
+    GroupHeaderDescriptionV1, FontSettingsDescription,
+    XAxisSettingsDescription, EpochInfoDescription,
+    CompiledEpochInfoDescription)
 from neo.test.rawiotest.common_rawio_test import BaseTestRawIO
 
 
@@ -24,5 +37,380 @@ class TestAxographRawIO(BaseTestRawIO, unittest.TestCase):
     entities_to_test = files_to_download
 
 
+def _pack_string(string):
+    encoded = string.encode('utf-16-be')
+    return Struct('>l').pack(len(encoded)) + encoded
+
+
+def _pack_description(description, **values):
+    """
+    Pack a header described by a list of (key, fmt) pairs, with the given
+    values and zeros (or empty strings) for all other fields
+    """
+
+    packed = b''
+    for key, fmt in description:
+        value = values.get(key)
+        if fmt == 'S':
+            packed += _pack_string(value or '')
+            continue
+        s = Struct('>' + fmt.replace('Z', 'l'))
+        if value is None:
+            value = s.unpack(bytes(s.size))
+        elif not isinstance(value, tuple):
+            value = (value,)
+        packed += s.pack(*value)
+    return packed
+
+
+def _header_values(description):
+    """
+    Return distinct values for the fields of a header description, in the
+    form in which StructFile.read_f returns them
+    """
+
+    values = {}
+    for i, (key, fmt) in enumerate(description):
+        if fmt == 'S':
+            values[key] = 'field {}'.format(i)
+        elif fmt == 'Z':
+            values[key] = bool(i % 2)
+        else:
+            # small byte values, so that floats are neither NaN nor infinite
+            s = Struct('>' + fmt)
+            value = s.unpack(bytes((i + k) % 64 for k in range(s.size)))
+            values[key] = value if len(value) > 1 else value[0]
+    return values
+
+
+def _write_axograph_file(filename, columns, n_episodes=1, n_groups=None,
+                         trace_header_versions=None):
+    """
+    Write a version 6 AxoGraph file with a time series column followed by
+    scaled short columns, given as (title, data) pairs in episode-major
+    order, and the metadata of n_episodes episodes of n_groups traces each.
+    Trace headers are version 2 unless trace_header_versions lists the
+    version of each trace, in the order in which they are stored.
+    """
+
+    if n_groups is None:
+        n_groups = len(columns)
+    n_points = len(columns[0][1])
+    out = b'axgx' + Struct('>ll').pack(6, len(columns) + 1)
+
+    # time column, a series
+    out += Struct('>ll').pack(n_points, 9) + _pack_string('Time (s)')
+    out += Struct('>dd').pack(0.0, 0.001)
+
+    # data columns, scaled shorts
+    for title, data in columns:
+        out += Struct('>ll').pack(len(data), 10) + _pack_string(title)
+        out += Struct('>dd').pack(0.5, 0.0)
+        out += np.asarray(data, dtype='>i2').tobytes()
+
+    # comment and notes
+    out += _pack_string('') + _pack_string('')
+
+    # traces, listed group by group, and groups
+    if trace_header_versions is None:
+        trace_header_versions = [2] * len(columns)
+    out += Struct('>l').pack(len(columns))
+    for group_id in range(n_groups):
+        for episode in range(n_episodes):
+            version = trace_header_versions[group_id * n_episodes + episode]
+            out += Struct('>l').pack(version)
+            out += _pack_description(
+                TRACE_HEADER_DESCRIPTIONS[version], x_index=0,
+                y_index=episode * n_groups + group_id + 1,
+                group_id_for_this_trace=group_id, hidden=1,
+                trace_color=(1, 2, 3))
+    out += Struct('>l').pack(n_groups)
+    for group_id in range(n_groups):
+        out += Struct('>l').pack(1)
+        out += _pack_description(GroupHeaderDescriptionV1, title='group')
+
+    # episodes: review list, two other lists and masked episodes
+    out += Struct('>9l').pack(*range(9))
+    for i in range(3):
+        out += Struct('>l').pack(n_episodes) + bytes(4 * n_episodes)
+    out += Struct('>d9ld4l').pack(0, *range(9), 0, *range(4))
+
+    # fonts, x-axis settings, and empty lists of events and epochs
+    for i in range(4):
+        out += _pack_description(FontSettingsDescription, setting1=75)
+    out += _pack_description(XAxisSettingsDescription)
+    out += Struct('>8l3d13l').pack(*([0] * 24))
+    out += Struct('>lll').pack(0, 0, 0)
+    out += Struct('>7l').pack(*range(7))
+    out += Struct('>l').pack(0)
+
+    with open(filename, 'wb') as f:
+        f.write(out)
+
+
+class TestStructFile(unittest.TestCase):
+    def test__read_struct_eof(self):
+        f = StructFile(bytes(6))
+        self.assertEqual(f.read_l(), 0)
+        self.assertRaises(EOFError, f.read_l)
+        self.assertRaises(EOFError, f.read_and_unpack, 'd')
+        self.assertEqual(f.tell(), 6)
+
+    def test__read_strings_eof(self):
+        data = _pack_string('abc') + b'\x00\x00'
+        f = StructFile(data)
+        self.assertRaises(EOFError, f.read_strings, 2)
+        self.assertEqual(f.tell(), len(data))
+
+        f = StructFile(_pack_string('abc') + Struct('>l').pack(-1))
+        self.assertEqual(f.read_strings(2), ['abc', ''])
+        self.assertRaises(EOFError, f.read_string)
+
+    def test__read_array_eof(self):
+        f = StructFile(Struct('>3l').pack(1, 2, 3))
+        np.testing.assert_array_equal(f.read_array('i4', 2), [1, 2])
+        self.assertRaises(EOFError, f.read_array, 'i4', 2)
+        self.assertEqual(f.tell(), 12)
+        np.testing.assert_array_equal(f.read_array('i4', 0), [])
+
+    def test__read_episode_list(self):
+        f = StructFile(Struct('>4l').pack(1, 0, 0, 1))
+        self.assertEqual(f.read_episode_list(4), [1, 4])
+
+    def test__read_description_matches_read_f(self):
+        for description in (TraceHeaderDescriptionV1, TraceHeaderDescriptionV2,
+                            GroupHeaderDescriptionV1, FontSettingsDescription,
+                            XAxisSettingsDescription, EpochInfoDescription):
+            values = _header_values(description)
+            data = _pack_description(description, **values) + b'tail'
+
+            f = StructFile(data)
+            info = f.read_description(_compile_description(description))
+            self.assertEqual(f.read(), b'tail')
+
+            f = StructFile(data)
+            expected = {key: f.read_f(fmt) for key, fmt in description}
+            self.assertEqual(info, expected)
+            self.assertEqual(info, values)
+
+    def test__read_description_as_record(self):
+        data = _pack_description(EpochInfoDescription, title='bar',
+                                 t_start=1.0, t_stop=2.5, y_pos=-1.0)
+        epoch = StructFile(data).read_description(
+            CompiledEpochInfoDescription, EpochInfo)
+        self.assertEqual(epoch, EpochInfo('bar', 1.0, 2.5, -1.0))
+
+    def test__read_description_eof(self):
+        compiled = _compile_description(TraceHeaderDescriptionV1)
+        data = _pack_description(TraceHeaderDescriptionV1)
+        self.assertRaises(EOFError, StructFile(data[:-1]).read_description,
+                          compiled)
+
+
+class TestDescriptionDtype(unittest.TestCase):
+    def test__matches_struct_layout(self):
+        for description in (TraceHeaderDescriptionV1, TraceHeaderDescriptionV2):
+            dtype = _description_dtype(description)
+            offset = 0
+            for key, fmt in description:
+                self.assertEqual(dtype.fields[key][1],
+                                 offset + fmt.count('x'), key)
+                offset += Struct('>' + fmt.replace('Z', 'l')).size
+            self.assertEqual(dtype.itemsize, offset)
+
+    def test__padding_and_subarrays(self):
+        dtype = _description_dtype([('a', 'l'), ('color', 'xBBB'),
+                                    ('b', 'd')])
+        self.assertEqual(dtype.itemsize, 16)
+        self.assertEqual(dtype.fields['color'][1], 5)
+        self.assertEqual(dtype['color'].shape, (3,))
+        self.assertEqual(dtype.fields['b'][1], 8)
+
+        data = Struct('>lxBBBd').pack(7, 1, 2, 3, 0.5)
+        record = np.frombuffer(data, dtype=dtype)[0]
+        self.assertEqual(record['a'], 7)
+        self.assertEqual(record['color'].tolist(), [1, 2, 3])
+        self.assertEqual(record['b'], 0.5)
+
+    def test__matches_read_description(self):
+        values = _header_values(TraceHeaderDescriptionV2)
+        data = _pack_description(TraceHeaderDescriptionV2, **values)
+        record = np.frombuffer(data, dtype=TRACE_HEADER_DTYPES[2])[0]
+        for key, value in values.items():
+            if isinstance(value, tuple):
+                self.assertEqual(tuple(record[key].tolist()), value, key)
+            else:
+                self.assertEqual(record[key], value, key)
+
+    def test__unsupported_format(self):
+        self.assertRaises(NotImplementedError, _description_dtype,
+                          [('title', 'S')])
+        self.assertRaises(NotImplementedError, _description_dtype,
+                          [('mixed', 'ld')])
+
+
+class TestAnalogSignalChunk(unittest.TestCase):
+    selections = [None, slice(None), slice(1, None), [1, 0], [0],
+                  np.array([1]), []]
+    ranges = [(None, None), (2, 7), (0, 1), (5, 5)]
+
+    def setUp(self):
+        self.tmpdir = tempfile.TemporaryDirectory()
+        self.addCleanup(self.tmpdir.cleanup)
+
+    def _read(self, titles, n_episodes=1, filename='file.axgx'):
+        n_groups = len(titles)
+        data = np.arange(10 * n_episodes * n_groups, dtype='i2').reshape(
+            n_episodes, n_groups, 10) * 3 - 50
+        columns = [(titles[g], data[e, g]) for e in range(n_episodes)
+                   for g in range(n_groups)]
+        filename = os.path.join(self.tmpdir.name, filename)
+        _write_axograph_file(filename, columns, n_episodes, n_groups)
+        reader = AxographRawIO(filename)
+        reader.parse_header()
+        self.assertEqual(reader.segment_count(0), n_episodes)
+        return reader, data
+
+    def _check_chunks(self, reader, data):
+        for seg_index in range(reader.segment_count(0)):
+            for channel_indexes in self.selections:
+                if channel_indexes is None:
+                    expected_channels = data[seg_index]
+                else:
+                    expected_channels = data[seg_index][channel_indexes]
+                for i_start, i_stop in self.ranges:
+                    chunk = reader.get_analogsignal_chunk(
+                        0, seg_index, i_start, i_stop, 0, channel_indexes)
+                    expected = expected_channels[:, i_start:i_stop].T
+                    self.assertEqual(chunk.shape, expected.shape)
+                    self.assertEqual(chunk.dtype.kind, 'i')
+                    np.testing.assert_array_equal(chunk, expected)
+
+    def test__evenly_spaced_columns(self):
+        reader, data = self._read(['Vm (mV)', 'Im (pA)'])
+        self.assertIsNotNone(reader._raw_signals_2d[0])
+        self._check_chunks(reader, data)
+
+    def test__unevenly_spaced_columns(self):
+        reader, data = self._read(['Vm (mV)', 'Current (pA)', 'Im (pA)'])
+        self.assertIsNone(reader._raw_signals_2d[0])
+        self._check_chunks(reader, data)
+
+    def test__episodes_of_evenly_spaced_columns(self):
+        reader, data = self._read(['Vm (mV)', 'Im (pA)'], n_episodes=3)
+        self.assertTrue(all(signals is not None
+                            for signals in reader._raw_signals_2d))
+        self._check_chunks(reader, data)
+
+    def test__episode_views_share_the_file_memmap(self):
+        reader, data = self._read(['Vm (mV)', 'Im (pA)'], n_episodes=3)
+        strides = reader._raw_signals_2d[0].strides
+        for seg_index, raw_signals_2d in enumerate(reader._raw_signals_2d):
+            # a (sample, channel) view, laid over the columns of the episode
+            self.assertEqual(raw_signals_2d.shape, (10, 2))
+            self.assertEqual(raw_signals_2d.strides, strides)
+            self.assertFalse(raw_signals_2d.flags.writeable)
+            for sig_memmap in reader._raw_signals[seg_index]:
+                self.assertTrue(np.shares_memory(raw_signals_2d, sig_memmap))
+            np.testing.assert_array_equal(raw_signals_2d, data[seg_index].T)
+
+    def test__episodes_of_unevenly_spaced_columns(self):
+        reader, data = self._read(['Vm (mV)', 'Current (pA)'], n_episodes=3)
+        self.assertTrue(all(signals is None
+                            for signals in reader._raw_signals_2d))
+        self._check_chunks(reader, data)
+
+    def test__fancy_reads_have_the_same_dtype_on_both_paths(self):
+        even, _ = self._read(['Vm (mV)', 'Im (pA)', 'Ix (pA)'],
+                             filename='even.axgx')
+        uneven, _ = self._read(['Vm (mV)', 'Current (pA)', 'Im (pA)'],
+                               filename='uneven.axgx')
+        self.assertIsNotNone(even._raw_signals_2d[0])
+        self.assertIsNone(uneven._raw_signals_2d[0])
+        for channel_indexes in ([2, 0], [1], np.array([0, 1]), []):
+            chunks = [reader.get_analogsignal_chunk(0, 0, 2, 7, 0,
+                                                    channel_indexes)
+                      for reader in (even, uneven)]
+            for chunk in chunks:
+                self.assertEqual(chunk.dtype, np.dtype('int16'))
+                self.assertTrue(chunk.dtype.isnative)
+
+    def test__all_selections_have_the_native_dtype(self):
+        for titles in (['Vm (mV)', 'Im (pA)'], ['Vm (mV)'],
+                       ['Vm (mV)', 'Current (pA)', 'Im (pA)']):
+            reader, _ = self._read(titles, filename='{}.axgx'.format(
+                len(titles)))
+            for channel_indexes in (None, slice(None), slice(1, None), [0]):
+                chunk = reader.get_analogsignal_chunk(0, 0, None, None, 0,
+                                                      channel_indexes)
+                self.assertEqual(chunk.dtype, np.dtype('int16'))
+                self.assertTrue(chunk.dtype.isnative)
+
+
+class TestTraceHeaders(unittest.TestCase):
+    def setUp(self):
+        self.tmpdir = tempfile.TemporaryDirectory()
+        self.addCleanup(self.tmpdir.cleanup)
+
+    def _read(self, trace_header_versions=None):
+        columns = [('Vm (mV)', np.arange(10)), ('Im (pA)', np.arange(10))] * 2
+        filename = os.path.join(self.tmpdir.name, 'file.axgx')
+        _write_axograph_file(filename, columns, n_episodes=2, n_groups=2,
+                             trace_header_versions=trace_header_versions)
+        reader = AxographRawIO(filename)
+        reader.parse_header()
+        return reader
+
+    def test__structured_array(self):
+        reader = self._read()
+        trace_headers = reader.info['trace_headers']
+        self.assertEqual(reader.info['trace_header_version'], 2)
+        self.assertEqual(trace_headers.dtype.names[0], 'trace_header_version')
+        self.assertEqual(set(trace_headers.dtype.names[1:]),
+                         set(key for key, fmt in TraceHeaderDescriptionV2))
+        self.assertTrue(trace_headers.dtype['min_x'].isnative)
+        # traces are stored group by group, episode by episode
+        np.testing.assert_array_equal(trace_headers['y_index'], [1, 3, 2, 4])
+        np.testing.assert_array_equal(
+            trace_headers['group_id_for_this_trace'], [0, 0, 1, 1])
+        np.testing.assert_array_equal(trace_headers['trace_color'],
+                                      [[1, 2, 3]] * 4)
+        self.assertEqual(reader.segment_count(0), 2)
+
+    def test__mixed_versions(self):
+        reader = self._read(trace_header_versions=[1, 2, 2, 1])
+        trace_headers = reader.info['trace_headers']
+        self.assertNotIn('trace_header_version', reader.info)
+        np.testing.assert_array_equal(trace_headers['trace_header_version'],
+                                      [1, 2, 2, 1])
+        np.testing.assert_array_equal(trace_headers['neg_err_bar_index'],
+                                      [-1, 0, 0, -1])
+        np.testing.assert_array_equal(trace_headers['y_index'], [1, 3, 2, 4])
+        self.assertEqual(reader.segment_count(0), 2)
+
+    def test__deprecated_trace_header_info_list(self):
+        reader = self._read(trace_header_versions=[1, 2, 2, 1])
+        trace_header_info_list = reader.info['trace_header_info_list']
+        with warnings.catch_warnings(record=True) as caught:
+            warnings.simplefilter('always')
+            self.assertEqual(list(trace_header_info_list), [1, 2, 3, 4])
+            trace_header_info = trace_header_info_list[1]
+        self.assertTrue(caught)
+        self.assertTrue(all(issubclass(w.category, DeprecationWarning)
+                            for w in caught))
+        self.assertEqual(list(trace_header_info),
+                         ['trace_header_version']
+                         + [key for key, fmt in TraceHeaderDescriptionV1])
+        self.assertEqual(trace_header_info['trace_header_version'], 1)
+        self.assertIs(trace_header_info['hidden'], True)
+        self.assertEqual(trace_header_info['trace_color'], (1, 2, 3))
+        self.assertEqual(trace_header_info['y_index'], 1)
+        with warnings.catch_warnings():
+            warnings.simplefilter('ignore')
+            self.assertIn('neg_err_bar_index', trace_header_info_list[2])
+            self.assertRaises(KeyError, trace_header_info_list.__getitem__, 0)
+            self.assertRaises(KeyError, trace_header_info_list.__getitem__, 5)
+
+
 if __name__ == "__main__":
     unittest.main()